@@ -1,5 +1,6 @@
 import os
 import pandas as pd
+from collections import OrderedDict
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, scoped_session
 
@@ -18,6 +19,13 @@ except ImportError:
 
 # declare our own base class that all of the modules in orm can import
 class Operation:
+    # LRU cache of the query results, disabled if the size is 0.
+    # Keyed by (table name, query type, criteria). Misses are cached as None.
+    # Cached rows are detached from the session, so that a commit or rollback
+    # does not expire them and reading them never queries the DB again.
+    _cache = OrderedDict()
+    _cache_size = 0
+
     def __init__(self, table : DeclarativeBase):
         self.table : DeclarativeBase = table
 
@@ -31,16 +39,68 @@ class Operation:
             res[attr] = val
         return res
 
+    @classmethod
+    def enable_cache(cls, size = 1024):
+        """ Enable caching of the query results, up to size entries. """
+        cls._cache_size = size
+        cls._cache.clear()
+        log.trace("Query cache size: {}", size)
+
+    @classmethod
+    def clear_cache(cls, tablename = None):
+        """ Remove the cached queries of a table, or all if not specified. """
+        if tablename is None:
+            cls._cache.clear()
+        else:
+            for key in [k for k in cls._cache if k[0] == tablename]:
+                del cls._cache[key]
+
+    @classmethod
+    def clear_misses(cls):
+        """ Remove the cached queries that did not find any row. """
+        for key in [k for k, v in cls._cache.items() if not v]:
+            del cls._cache[key]
+
+    def _cached_query(self, session, kind, criteria, query):
+        """ Run the query function or return the cached result. """
+        if self._cache_size <= 0:
+            return query()
+
+        try:
+            key = (self.table.__tablename__, kind, frozenset(criteria.items()))
+            hash(key)
+        except TypeError:
+            # Unhashable criteria values, do not cache.
+            return query()
+
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        res = query()
+        for row in (res if kind == "all" else [res]):
+            if row is not None:
+                session.expunge(row)
+
+        self._cache[key] = res
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return res
+
     def get_one(self, session, criteria = {}) -> DeclarativeBase:
         """ Get the first element from current table using a criteria ."""
-        return session.query(self.table.__class__).filter_by(**criteria).first()
+        return self._cached_query(session, "one", criteria,
+            lambda: session.query(self.table.__class__).filter_by(**criteria).first())
 
     def get_all(self, session, criteria = {}) -> list[DeclarativeBase]:
         """ Get all the elements from current table using a criteria ."""
-        return session.query(self.table.__class__).filter_by(**criteria).all()
+        # Copy, so that the callers can not modify the cached list.
+        return list(self._cached_query(session, "all", criteria,
+            lambda: session.query(self.table.__class__).filter_by(**criteria).all()))
 
     def insert(self, session, *, test=False):
         payload = self.serialize()
+        self.clear_cache(self.table.__tablename__)
         try:
             session.execute(insert(self.table.__class__), payload)
         except Exception as err:
@@ -53,6 +113,7 @@ class Operation:
 
     def update(self, session, newObj, *, test=False):
         values = newObj.serialize()
+        self.clear_cache(self.table.__tablename__)
         try:
             sql = update(self.table.__class__).where(self.id == newObj.id).values(**values)
             self.session.execute(sql)
@@ -215,6 +276,7 @@ def connect():
 
 def disconnect():
     global ssh, eng, sess
+    Operation.clear_cache()
     if sess is not None:
         sess.close()
     if ssh is not None:
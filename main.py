@@ -9,6 +9,7 @@ import db
 import prepare as prep
 import test_idempotence as idem
 import namelist
+import watch
 
 def parse_arguments():
     parser = argparse.ArgumentParser(prog='polylet', description="PolyDB uploader")
@@ -20,6 +21,21 @@ def parse_arguments():
                         type=int,
                         help="1-8, higher is more verbose (default 6).")
 
+    parser.add_argument("--datadir",
+                        default="Kevin_MD_data",
+                        help="Directory of the CSV datasets (default Kevin_MD_data).")
+
+    parser.add_argument("--interval",
+                        default=10,
+                        type=float,
+                        help="Seconds between the directory scans of watch (default 10).")
+
+    parser.add_argument("--cache",
+                        default=None,
+                        type=int,
+                        help="Max number of DB queries to cache, 0 to disable "
+                             "(default 1024 for watch, disabled for prepare).")
+
     parser.add_argument("--debug",
                         action="store_true",
                         default=False,
@@ -49,6 +65,8 @@ def main():
 
     if args.command == "prepare":
         args.session = db.connect()
+        if args.cache is not None and args.cache > 0:
+            db.Operation.enable_cache(args.cache)
         prep.prepare(args)
 
     if args.command == "check":
@@ -57,13 +75,20 @@ def main():
     elif args.command == "upload":
         print("Non implemented!")
 
+    elif args.command == "watch":
+        args.session = db.connect()
+        cache = 1024 if args.cache is None else args.cache
+        if cache > 0:
+            db.Operation.enable_cache(cache)
+        watch.run(args)
+
     elif args.command == "namelist":
         args.session = db.connect()
         namelist.run(args)
 
     else:
         log.error("Unknown command: {}", args.command)
-        log.note("Please specify one: {}", ['prepare', 'upload'])
+        log.note("Please specify one: {}", ['prepare', 'watch', 'upload'])
 
     db.disconnect()
     log.close()
@@ -1,5 +1,6 @@
 import os, sys
 import json
+import functools
 import pandas as pd
 
 import db
@@ -8,15 +9,42 @@ import pgfingerprinting.fp as pgfp
 from psmiles import PolymerSmiles
 
 sys.path.append("polydb")
-from polydb.orm import homopolymer, property
+from polydb.orm import homopolymer
+from polydb.orm import property as prop_orm
 
 log = pylogg.New("prep")
 
 
+# Max number of polymer records to keep in memory.
+MAX_POLYMER_RECORDS = 65536
+
+
+class Polymer:
+    """ Processing record of a polymer smiles.
+        The smiles is canonicalized once, and the canonical form and
+        fingerprint are carried through the pipeline.
+    """
+    def __init__(self, smiles) -> None:
+        self.smiles = smiles
+        self.canonical_smiles = str(PolymerSmiles(smiles).canonicalize)
+        self._fingerprint = None
+
+    def fingerprint(self):
+        """ Polymer Genome fingerprint, calculated on the first call. """
+        if self._fingerprint is None:
+            self._fingerprint = pg_fingerprint(self.canonical_smiles)
+        return self._fingerprint
+
+
+@functools.lru_cache(maxsize=MAX_POLYMER_RECORDS)
+def polymer_record(smiles) -> Polymer:
+    """ Get the processing record of a smiles, create it if not found. """
+    return Polymer(smiles)
+
+
 def canonical(smiles) -> str:
     """ Convert a smiles into it's cannonical form. """
-    ps = PolymerSmiles(smiles)
-    return str(ps.canonicalize)
+    return polymer_record(smiles).canonical_smiles
 
 
 def pg_fingerprint(canon):
@@ -26,17 +54,17 @@ def pg_fingerprint(canon):
 
 def add_new_polymer(polylist, smiles, polymer_category = "known"):
     """ Add a new polymer smiles to the list if it already not added. """
-    canon = canonical(smiles)
+    record = polymer_record(smiles)
 
     # Confirm that the polymer is not already added
-    if not polylist.contains('canonical_smiles', canon):
+    if not polylist.contains('canonical_smiles', record.canonical_smiles):
         log.info("New homopolymer: {}", smiles)
         polylist.add(
             pid = None,
             rid = None,
             smiles = smiles,
-            canonical_smiles = canon,
-            pg_fingerprint = json.dumps(pg_fingerprint(canon)),
+            canonical_smiles = record.canonical_smiles,
+            pg_fingerprint = json.dumps(record.fingerprint()),
             # Manually set this using the release version specified in
             # https://github.com/Ramprasad-Group/pgfingerprinting/releases
             pg_fingerprint_version = "2.0.0",
@@ -97,7 +125,7 @@ def prepare_property_csv(conn, csv, polylist : db.Frame, shortname : str, *,
     # If the property does not exist, we will leave it blank.
     if shortname is not None:
         try:
-            ops = db.Operation(property.Property())
+            ops = db.Operation(prop_orm.Property())
             propId = ops.get_one(conn, {'short_name': shortname}).prop_id
         except:
             propId = None
@@ -112,13 +140,13 @@ def prepare_property_csv(conn, csv, polylist : db.Frame, shortname : str, *,
         # Column map is a map between the CSV column names and the DB column names.
         val = row[column_map['value']]
         sml = row[column_map['smiles']]
-        csml = canonical(sml)
+        record = polymer_record(sml)
+        csml = record.canonical_smiles
         log.trace("Row {}, SMILES = {}", i+1, sml)
 
         # Check if the polymer exists in DB using the cannonical smiles.
-        polymer = {"canonical_smiles": csml}
         ops = db.Operation(homopolymer.Homopolymer())
-        res = ops.get_one(conn, polymer)
+        res = ops.get_one(conn, {"canonical_smiles": csml})
 
         if res is not None:
             log.info("Polymer found in DB.")
@@ -154,75 +182,96 @@ def prepare_property_csv(conn, csv, polylist : db.Frame, shortname : str, *,
     return polylist, newpolyprop, oldpolyprop
 
 
-def prepare(args):
-    datadir = "Kevin_MD_data"
-
-    # Make property list
+# Known datasets of the MD data directory, keyed by the csv file name.
+# Outputs are saved as <prefix>_existing_polymers.jsonl and
+# <prefix>_new_polymers.jsonl in the data directory.
+datasets = {
+    "Tg.csv": dict(
+        shortname = "Tg",
+        prefix = "tg",
+        column_map = {'smiles': 'smiles', 'value': 'Value'},
+        conditions_map = {},
+        note = "Source: pmd database by Kevin",
+    ),
+    "Dgas.csv": dict(
+        shortname = "D_gas",
+        prefix = "gas_diffusivity",
+        column_map = {'smiles': 'smiles', 'value': 'value'},
+        conditions_map = {'gas': 'gas'},
+        note = "Source: pmd database by Kevin",
+    ),
+    "Dsol.csv": dict(
+        shortname = "D_sol",
+        prefix = "solvent_diffusivity",
+        column_map = {'smiles': 'smiles', 'value': 'value'},
+        conditions_map = {
+            'solvent_smiles': 'solvent_smiles',
+            'ratio': 'ratio',
+            'temp': 'temp'
+        },
+        note = "Source: pmd database by Kevin.\n"+
+               "Ratio is defined as the number of monomers over the number of solvent molecules.",
+    ),
+    "Sgas.csv": dict(
+        shortname = "sol_g",
+        prefix = "gas_solubility",
+        column_map = {'smiles': 'smiles', 'value': 'value'},
+        conditions_map = {
+            'gas': 'gas'
+        },
+        note = "Source: pmd database by Kevin",
+    ),
+}
+
+
+def save_new_properties(datadir):
+    """ Save the list of properties that need to be added to the DB. """
     prop = db.Frame()
     prop.add(name="Gas Diffusivity", short_name="D_gas", unit="cm^2/s", plot_symbol="$\D_\text{g}$")
     prop.add(name="Solvent Diffusivity", short_name="D_sol", unit="cm^2/s", plot_symbol="$\D_\text{s}$")
     prop.add(name="Gas Solubility", short_name="sol_g", unit="cc(STP)/cc*cmHg", plot_symbol="$\delta_\text{g}$")
     prop.df.to_json(datadir + "/new_properties.jsonl", orient='records', lines=True)
 
-    n_poly = db.Frame() # list of new polymers
 
-    # Tg
-    csv = os.path.join(datadir, "Tg.csv")
-    n_poly, n_prop, o_prop = prepare_property_csv(args.session, csv, n_poly,
-                                             "Tg",
-                                             column_map = {'smiles': 'smiles', 'value': 'Value'},
-                                             conditions_map = {},
-                                             note = "Source: pmd database by Kevin",
-                                             debug = args.debug)
+def prepare_dataset(conn, datadir, csvfile, polylist : db.Frame, *, debug=False):
+    """
+    Prepare a known dataset of the data directory and save the outputs.
+    Args:
+        conn:       Database session object.
+        datadir:    Directory of the csv file and the outputs.
+        csvfile:    Name of the csv file, must be a key of `datasets`.
+        polylist:   New polymer list, that will be populated.
+
+    Returns:
+        A tuple of (list of new polymers, number of processed rows)
+    """
+    dataset = datasets[csvfile]
+    csv = os.path.join(datadir, csvfile)
+    polylist, n_prop, o_prop = prepare_property_csv(conn, csv, polylist,
+                                    dataset['shortname'],
+                                    column_map = dataset['column_map'],
+                                    conditions_map = dataset['conditions_map'],
+                                    note = dataset['note'],
+                                    debug = debug)
 
     # Save
-    o_prop.df.to_json(datadir + "/tg_existing_polymers.jsonl", orient='records', lines=True)
-    n_prop.df.to_json(datadir + "/tg_new_polymers.jsonl", orient='records', lines=True)
-
-    # Dgas
-    csv = os.path.join(datadir, "Dgas.csv")
-    n_poly, n_prop, o_prop = prepare_property_csv(args.session, csv, n_poly,
-                                             "D_gas",
-                                             column_map = {'smiles': 'smiles', 'value': 'value'},
-                                             conditions_map = {'gas': 'gas'},
-                                             note = "Source: pmd database by Kevin",
-                                             debug = args.debug)
+    prefix = os.path.join(datadir, dataset['prefix'])
+    o_prop.df.to_json(prefix + "_existing_polymers.jsonl", orient='records', lines=True)
+    n_prop.df.to_json(prefix + "_new_polymers.jsonl", orient='records', lines=True)
 
-    # Save
-    o_prop.df.to_json(datadir + "/gas_diffusivity_existing_polymers.jsonl", orient='records', lines=True)
-    n_prop.df.to_json(datadir + "/gas_diffusivity_new_polymers.jsonl", orient='records', lines=True)
-
-    # Dsol
-    csv = os.path.join(datadir, "Dsol.csv")
-    n_poly, n_prop, o_prop = prepare_property_csv(args.session, csv, n_poly,
-                                             "D_sol",
-                                             column_map = {'smiles': 'smiles', 'value': 'value'},
-                                             conditions_map = {
-                                                 'solvent_smiles': 'solvent_smiles',
-                                                 'ratio': 'ratio',
-                                                 'temp': 'temp'
-                                             },
-                                             note = "Source: pmd database by Kevin.\n"+
-                                                    "Ratio is defined as the number of monomers over the number of solvent molecules.",
-                                             debug = args.debug)
+    return polylist, n_prop.df.shape[0] + o_prop.df.shape[0]
 
-    # Save
-    o_prop.df.to_json(datadir + "/solvent_diffusivity_existing_polymers.jsonl", orient='records', lines=True)
-    n_prop.df.to_json(datadir + "/solvent_diffusivity_new_polymers.jsonl", orient='records', lines=True)
-
-    # Sgas
-    csv = os.path.join(datadir, "Sgas.csv")
-    n_poly, n_prop, o_prop = prepare_property_csv(args.session, csv, n_poly,
-                                             "sol_g",
-                                             column_map = {'smiles': 'smiles', 'value': 'value'},
-                                             conditions_map = {
-                                                 'gas': 'gas'
-                                             },
-                                             note = "Source: pmd database by Kevin",
-                                             debug = args.debug)
 
-    # Save
-    o_prop.df.to_json(datadir + "/gas_solubility_existing_polymers.jsonl", orient='records', lines=True)
-    n_prop.df.to_json(datadir + "/gas_solubility_new_polymers.jsonl", orient='records', lines=True)
+def prepare(args):
+    datadir = args.datadir
+
+    # Make property list
+    save_new_properties(datadir)
+
+    n_poly = db.Frame() # list of new polymers
+
+    for csvfile in datasets:
+        n_poly, _ = prepare_dataset(args.session, datadir, csvfile, n_poly,
+                                    debug = args.debug)
 
     save_new_polymers_list(n_poly.df, datadir + "/new_polymer_list.jsonl")
@@ -0,0 +1,65 @@
+"""
+    Test setup. Heavy chemistry and polydb packages are replaced with
+    simple fakes when they are not installed, so that the data preparation
+    logic can be tested without RDKit or a database.
+"""
+import os
+import sys
+import types
+import importlib.util
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _module(name, **attrs):
+    mod = types.ModuleType(name)
+    mod.__dict__.update(attrs)
+    sys.modules[name] = mod
+    return mod
+
+
+class FakePolymerSmiles:
+    """ Canonical form is the upper case smiles. """
+    def __init__(self, smiles):
+        self.smiles = smiles
+
+    @property
+    def canonicalize(self):
+        return FakePolymerSmiles(self.smiles.upper())
+
+    def __str__(self):
+        return self.smiles
+
+
+class Homopolymer:
+    __tablename__ = "homopolymer"
+
+
+class Property:
+    __tablename__ = "property"
+
+
+if importlib.util.find_spec("psmiles") is None:
+    _module("psmiles", PolymerSmiles=FakePolymerSmiles)
+
+if importlib.util.find_spec("pgfingerprinting") is None:
+    pgfp = _module("pgfingerprinting.fp",
+                   fingerprint_from_smiles=lambda smiles: {"len": len(smiles)})
+    _module("pgfingerprinting", fp=pgfp)
+
+if importlib.util.find_spec("polydb") is None:
+    hp = _module("polydb.orm.homopolymer", Homopolymer=Homopolymer)
+    prop = _module("polydb.orm.property", Property=Property)
+    orm = _module("polydb.orm", homopolymer=hp, property=prop)
+    _module("polydb", orm=orm)
+
+
+@pytest.fixture
+def cache():
+    """ Enable the DB query cache for a test. """
+    import db
+    db.Operation.enable_cache(2)
+    yield db.Operation._cache
+    db.Operation.enable_cache(0)
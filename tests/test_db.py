@@ -0,0 +1,173 @@
+from sqlalchemy import Integer, String, create_engine, delete, event
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, sessionmaker
+
+import db
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Item(Base):
+    __tablename__ = "item"
+    id : Mapped[int] = mapped_column(Integer, primary_key=True)
+    name : Mapped[str] = mapped_column(String)
+
+
+class Other(Base):
+    __tablename__ = "other"
+    id : Mapped[int] = mapped_column(Integer, primary_key=True)
+
+
+class Query:
+    def __init__(self, session, table):
+        self.session = session
+        self.table = table
+
+    def filter_by(self, **criteria):
+        self.criteria = criteria
+        return self
+
+    def first(self):
+        self.session.queries += 1
+        return self.session.rows.get(self.criteria.get("name"))
+
+    def all(self):
+        self.session.queries += 1
+        return list(self.session.rows.values())
+
+
+class Session:
+    """ In memory rows keyed by name, counts the queries. """
+    def __init__(self):
+        self.rows = {}
+        self.queries = 0
+
+    def query(self, table):
+        return Query(self, table)
+
+    def execute(self, sql, payload=None):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def expunge(self, obj):
+        pass
+
+
+def test_cache_disabled_by_default():
+    session = Session()
+    ops = db.Operation(Item())
+    ops.get_one(session, {"name": "a"})
+    ops.get_one(session, {"name": "a"})
+    assert session.queries == 2
+
+
+def test_cache_hits_and_misses(cache):
+    session = Session()
+    session.rows["a"] = "row a"
+    ops = db.Operation(Item())
+
+    assert ops.get_one(session, {"name": "a"}) == "row a"
+    assert ops.get_one(session, {"name": "a"}) == "row a"
+    assert ops.get_one(session, {"name": "b"}) is None
+    assert ops.get_one(session, {"name": "b"}) is None
+    assert session.queries == 2
+
+
+def test_cache_lru_eviction(cache):
+    session = Session()
+    ops = db.Operation(Item())
+
+    ops.get_one(session, {"name": "a"})
+    ops.get_one(session, {"name": "b"})
+    ops.get_one(session, {"name": "a"})     # a is now most recent
+    ops.get_one(session, {"name": "c"})     # evicts b
+    assert len(cache) == 2
+    assert session.queries == 3
+
+    ops.get_one(session, {"name": "a"})
+    assert session.queries == 3
+    ops.get_one(session, {"name": "b"})
+    assert session.queries == 4
+
+
+def test_insert_invalidates_table(cache):
+    session = Session()
+    ops = db.Operation(Item(name="a"))
+    other = db.Operation(Other())
+
+    assert ops.get_one(session, {"name": "a"}) is None
+    other.get_one(session, {})
+
+    session.rows["a"] = "row a"
+    ops.insert(session)
+
+    assert ops.get_one(session, {"name": "a"}) == "row a"
+    other.get_one(session, {})
+    assert session.queries == 3
+
+
+def test_upsert_reuses_lookup(cache):
+    session = Session()
+    session.rows["a"] = "row a"
+    ops = db.Operation(Item(name="a"))
+
+    assert ops.upsert(session, {"name": "a"}, Item(name="a"), "a") == "row a"
+    assert session.queries == 1
+
+
+def test_get_all_returns_copy(cache):
+    session = Session()
+    session.rows["a"] = "row a"
+    ops = db.Operation(Item())
+
+    res = ops.get_all(session)
+    res.append("junk")
+    assert ops.get_all(session) == ["row a"]
+    assert session.queries == 1
+
+
+def test_clear_misses(cache):
+    session = Session()
+    session.rows["a"] = "row a"
+    ops = db.Operation(Item())
+
+    ops.get_one(session, {"name": "a"})
+    ops.get_one(session, {"name": "b"})
+    db.Operation.clear_misses()
+
+    ops.get_one(session, {"name": "a"})
+    ops.get_one(session, {"name": "b"})
+    assert session.queries == 3
+
+
+def test_cached_rows_survive_commit(cache):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add(Item(id=1, name="a"))
+    session.commit()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, sql, *args: statements.append(sql))
+
+    ops = db.Operation(Item())
+    row = ops.get_one(session, {"name": "a"})
+    assert len(statements) == 1
+
+    # Commit on another table, then delete the cached row.
+    db.Operation(Other(id=1)).insert(session)
+    session.execute(delete(Item))
+    session.commit()
+    statements.clear()
+
+    cached = ops.get_one(session, {"name": "a"})
+    assert cached is row
+    assert (cached.id, cached.name) == (1, "a")
+    assert statements == []
@@ -0,0 +1,128 @@
+import os
+import json
+from collections import OrderedDict
+
+import pandas as pd
+
+import db
+import prepare as prep
+
+
+class Query:
+    def __init__(self, session, table):
+        self.session = session
+        self.table = table
+
+    def filter_by(self, **criteria):
+        self.session.queries.append((self.table.__tablename__, criteria))
+        return self
+
+    def first(self):
+        self.session.count += 1
+        return None
+
+
+class Session:
+    """ Empty database that records the queries. """
+    def __init__(self):
+        self.queries = []
+        self.count = 0
+
+    def query(self, table):
+        return Query(self, table)
+
+    def expunge(self, obj):
+        pass
+
+
+def test_polymer_record_parsed_once(monkeypatch):
+    prep.polymer_record.cache_clear()
+    parsed = []
+    original = prep.Polymer.__init__
+    def init(self, smiles):
+        parsed.append(smiles)
+        original(self, smiles)
+    monkeypatch.setattr(prep.Polymer, "__init__", init)
+
+    assert prep.canonical("[*]cc[*]") == "[*]CC[*]"
+    polylist = db.Frame()
+    prep.add_new_polymer(polylist, "[*]cc[*]")
+    prep.add_new_polymer(polylist, "[*]cc[*]")
+
+    assert parsed == ["[*]cc[*]"]
+    assert polylist.df.shape[0] == 1
+    assert json.loads(polylist.df.pg_fingerprint[0]) == {"len": 8}
+
+
+def test_prepare_property_csv(tmp_path):
+    csv = tmp_path / "Tg.csv"
+    pd.DataFrame({"smiles": ["[*]cc[*]", "[*]co[*]", "[*]cc[*]"],
+                  "Value": [300, 310, 320]}).to_csv(csv, index=False)
+
+    session = Session()
+    polylist, newprop, oldprop = prep.prepare_property_csv(
+        session, str(csv), db.Frame(), "Tg",
+        column_map = {'smiles': 'smiles', 'value': 'Value'},
+        conditions_map = {})
+
+    assert list(polylist.df.canonical_smiles) == ["[*]CC[*]", "[*]CO[*]"]
+    assert newprop.df.shape[0] == 3
+    assert oldprop.df.shape[0] == 0
+    assert session.queries[0] == ("property", {"short_name": "Tg"})
+    assert session.queries[1] == ("homopolymer", {"canonical_smiles": "[*]CC[*]"})
+
+
+def test_prepare_output_paths(tmp_path, monkeypatch):
+    def prepare_property_csv(conn, csv, polylist, shortname, **kwargs):
+        assert os.path.basename(csv) in prep.datasets
+        props = db.Frame()
+        props.add(value=1)
+        return polylist, props, props
+    monkeypatch.setattr(prep, "prepare_property_csv", prepare_property_csv)
+    monkeypatch.setattr(prep, "save_new_polymers_list",
+                        lambda df, outfile: open(outfile, "w").close())
+
+    class Args:
+        session = None
+        datadir = str(tmp_path)
+        debug = False
+
+    prep.prepare(Args())
+
+    datadir = str(tmp_path)
+    for name in ["tg", "gas_diffusivity", "solvent_diffusivity", "gas_solubility"]:
+        assert os.path.isfile(datadir + "/" + name + "_existing_polymers.jsonl")
+        assert os.path.isfile(datadir + "/" + name + "_new_polymers.jsonl")
+    assert os.path.isfile(datadir + "/new_properties.jsonl")
+    assert os.path.isfile(datadir + "/new_polymer_list.jsonl")
+
+
+def test_prepare_dataset_rows(tmp_path, monkeypatch):
+    def prepare_property_csv(conn, csv, polylist, shortname, **kwargs):
+        newprop, oldprop = db.Frame(), db.Frame()
+        newprop.add(value=1)
+        oldprop.add(value=2)
+        oldprop.add(value=3)
+        return polylist, newprop, oldprop
+    monkeypatch.setattr(prep, "prepare_property_csv", prepare_property_csv)
+
+    _, rows = prep.prepare_dataset(None, str(tmp_path), "Dgas.csv", db.Frame())
+    assert rows == 3
+
+
+def test_prepare_property_csv_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(db.Operation, "_cache", OrderedDict())
+    monkeypatch.setattr(db.Operation, "_cache_size", 100)
+
+    csv = tmp_path / "Tg.csv"
+    pd.DataFrame({"smiles": ["[*]cc[*]", "[*]co[*]", "[*]cc[*]"],
+                  "Value": [300, 310, 320]}).to_csv(csv, index=False)
+
+    session = Session()
+    for i in range(2):
+        prep.prepare_property_csv(
+            session, str(csv), db.Frame(), "Tg",
+            column_map = {'smiles': 'smiles', 'value': 'Value'},
+            conditions_map = {})
+        # One property and two unique homopolymer lookups.
+        assert session.count == 3
@@ -0,0 +1,181 @@
+import os
+import json
+
+import pytest
+import pandas as pd
+
+import db
+import watch
+import prepare as prep
+
+
+class Session:
+    def __init__(self):
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """ Replace the dataset preparation, record the prepared files. """
+    prepared = []
+    def prepare_dataset(conn, datadir, csvfile, polylist, *, debug=False):
+        prepared.append(csvfile)
+        return polylist, 3
+    monkeypatch.setattr(prep, "prepare_dataset", prepare_dataset)
+    return prepared
+
+
+def write(path, text):
+    with open(path, "w") as fp:
+        fp.write(text)
+
+
+def test_prepare_after_file_is_stable(tmp_path, calls):
+    write(tmp_path / "Tg.csv", "smiles,Value\n")
+    w = watch.Watcher(Session(), str(tmp_path))
+
+    w.step()
+    assert calls == []
+
+    w.step()
+    assert calls == ["Tg.csv"]
+
+    w.step()
+    assert calls == ["Tg.csv"]
+    assert w.stats.files == 1
+    assert w.stats.rows == 3
+
+
+def test_prepare_changed_file(tmp_path, calls):
+    write(tmp_path / "Tg.csv", "smiles,Value\n")
+    w = watch.Watcher(Session(), str(tmp_path))
+    w.step()
+    w.step()
+
+    write(tmp_path / "Tg.csv", "smiles,Value\n[*]CC[*],300\n")
+    w.step()
+    assert calls == ["Tg.csv"]
+
+    w.step()
+    assert calls == ["Tg.csv", "Tg.csv"]
+
+
+def test_restart_skips_prepared_files(tmp_path, calls):
+    write(tmp_path / "Tg.csv", "smiles,Value\n")
+    w = watch.Watcher(Session(), str(tmp_path))
+    w.step()
+    w.step()
+
+    w = watch.Watcher(Session(), str(tmp_path))
+    w.step()
+    w.step()
+    assert calls == ["Tg.csv"]
+
+    with open(tmp_path / "watch_status.json") as fp:
+        assert json.load(fp)["cycles"] == 2
+
+
+def test_unknown_dataset_skipped(tmp_path, calls):
+    write(tmp_path / "Other.csv", "a,b\n")
+    w = watch.Watcher(Session(), str(tmp_path))
+    w.step()
+    w.step()
+    assert calls == []
+    assert w.skipped == {"Other.csv"}
+
+
+def test_missing_datadir(tmp_path, calls):
+    w = watch.Watcher(Session(), str(tmp_path / "missing"))
+    w.step()
+    assert calls == []
+    assert w.stats.errors >= 1
+
+
+def test_file_removed_during_scan(tmp_path, calls, monkeypatch):
+    write(tmp_path / "Tg.csv", "smiles,Value\n")
+
+    def signature(path):
+        raise FileNotFoundError(path)
+    monkeypatch.setattr(watch, "_signature", signature)
+
+    w = watch.Watcher(Session(), str(tmp_path))
+    assert w.scan() == {}
+    assert w.stats.errors == 1
+
+
+def test_failed_dataset_not_persisted(tmp_path, monkeypatch):
+    attempts = []
+    def prepare_dataset(conn, datadir, csvfile, polylist, *, debug=False):
+        attempts.append(csvfile)
+        raise ConnectionError("DB down")
+    monkeypatch.setattr(prep, "prepare_dataset", prepare_dataset)
+
+    write(tmp_path / "Tg.csv", "smiles,Value\n")
+    session = Session()
+    w = watch.Watcher(session, str(tmp_path))
+    w.step()
+    w.step()
+    w.step()
+
+    # Not retried before the delay.
+    assert attempts == ["Tg.csv"]
+    assert session.rollbacks == 1
+    assert w.stats.errors == 1
+    assert w.stats.serialize()["status"] == "error"
+    assert not os.path.isfile(tmp_path / "watch_done.json")
+
+    # Retried after the delay.
+    w.failed["Tg.csv"] = (w.failed["Tg.csv"][0], 0)
+    w.step()
+    assert attempts == ["Tg.csv", "Tg.csv"]
+
+    # Retried after a restart.
+    w = watch.Watcher(session, str(tmp_path))
+    w.step()
+    w.step()
+    assert attempts == ["Tg.csv", "Tg.csv", "Tg.csv"]
+
+
+def test_restart_keeps_new_polymers(tmp_path, monkeypatch):
+    polymers = {"Tg.csv": "[*]CC[*]", "Dgas.csv": "[*]CO[*]"}
+    def prepare_dataset(conn, datadir, csvfile, polylist, *, debug=False):
+        polylist.add(smiles=polymers[csvfile].lower(),
+                     canonical_smiles=polymers[csvfile])
+        return polylist, 1
+    monkeypatch.setattr(prep, "prepare_dataset", prepare_dataset)
+
+    write(tmp_path / "Tg.csv", "smiles,Value\n")
+    w = watch.Watcher(Session(), str(tmp_path))
+    w.step()
+    w.step()
+
+    w = watch.Watcher(Session(), str(tmp_path))
+    write(tmp_path / "Dgas.csv", "smiles,value,gas\n")
+    w.step()
+    w.step()
+
+    df = pd.read_json(tmp_path / "new_polymer_list.jsonl", lines=True)
+    assert sorted(df.canonical_smiles) == ["[*]CC[*]", "[*]CO[*]"]
+
+
+def test_stats_throughput():
+    stats = watch.Stats()
+    assert stats.serialize()["rows_per_sec"] == 0.0
+
+    stats.rows = 50
+    stats.busy = 4.0
+    res = stats.serialize()
+    assert res["rows_per_sec"] == 12.5
+    assert res["status"] == "ok"
+
+
+def test_misses_cleared_each_cycle(tmp_path, calls, cache):
+    cache[("homopolymer", "one", frozenset({("name", "a")}))] = None
+    cache[("homopolymer", "one", frozenset({("name", "b")}))] = "row b"
+
+    w = watch.Watcher(Session(), str(tmp_path))
+    w.step()
+    assert list(cache.values()) == ["row b"]
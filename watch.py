@@ -0,0 +1,221 @@
+"""
+    Watch the MD data directory and prepare new or changed datasets.
+    The DB session and the processed polymer records are kept in memory
+    between the datasets.
+"""
+import os
+import json
+import time
+import signal
+import pandas as pd
+
+import db
+import pylogg
+import prepare as prep
+
+log = pylogg.New("watch")
+
+
+class Stats:
+    """ Health and throughput statistics of the watcher. """
+    def __init__(self) -> None:
+        self.started = time.time()
+        self.cycles = 0
+        self.files = 0
+        self.rows = 0
+        self.busy = 0.0
+        self.errors = 0
+        self.last_error = None
+        self.last_file = None
+
+    def error(self, message):
+        self.errors += 1
+        self.last_error = message
+
+    def serialize(self):
+        uptime = time.time() - self.started
+        return {
+            'status': 'ok' if self.last_error is None else 'error',
+            'uptime': round(uptime, 1),
+            'cycles': self.cycles,
+            'files': self.files,
+            'rows': self.rows,
+            'rows_per_sec': round(self.rows / self.busy, 2) if self.busy else 0.0,
+            'polymers': prep.polymer_record.cache_info().currsize,
+            'errors': self.errors,
+            'last_error': self.last_error,
+            'last_file': self.last_file,
+        }
+
+    def save(self, outfile):
+        with open(outfile, "w") as fp:
+            json.dump(self.serialize(), fp, indent=2)
+
+
+def _signature(path):
+    """ Modification time and size of a file to detect changes. """
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+class Watcher:
+    """ Prepare the known datasets of a directory when they change.
+        Signatures of the prepared files are saved in the directory,
+        so that a restart only picks up the files changed since.
+        Failed files are retried after retry_delay seconds.
+    """
+    retry_delay = 300
+
+    def __init__(self, session, datadir, *, debug=False) -> None:
+        self.session = session
+        self.datadir = datadir
+        self.debug = debug
+        self.statfile = os.path.join(datadir, "watch_status.json")
+        self.donefile = os.path.join(datadir, "watch_done.json")
+        self.polyfile = os.path.join(datadir, "new_polymer_list.jsonl")
+
+        self.stats = Stats()
+        self.done = self._load_done()   # signatures of the prepared files
+        self.failed = {}                # signature and retry time of the failed files
+        self.seen = {}                  # signatures of the previous scan
+        self.skipped = set()            # unknown csv files
+        self.polylist = self._load_polylist() # list of new polymers
+
+    def _load_done(self) -> dict:
+        try:
+            with open(self.donefile) as fp:
+                return {k : tuple(v) for k, v in json.load(fp).items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as err:
+            log.error("Load ({}) - {}", self.donefile, err)
+            return {}
+
+    def _load_polylist(self) -> db.Frame:
+        """ New polymers of the already prepared files. """
+        polylist = db.Frame()
+        if not self.done or not os.path.isfile(self.polyfile):
+            return polylist
+        try:
+            df = pd.read_json(self.polyfile, orient='records', lines=True, dtype=False)
+        except (OSError, ValueError) as err:
+            log.error("Load ({}) - {}", self.polyfile, err)
+            return polylist
+        for item in df.to_dict(orient='records'):
+            polylist.add(**item)
+        log.note("Loaded {} new polymers.", df.shape[0])
+        return polylist
+
+    def _save(self, done_changed):
+        try:
+            if done_changed:
+                with open(self.donefile, "w") as fp:
+                    json.dump(self.done, fp, indent=2)
+            self.stats.save(self.statfile)
+        except OSError as err:
+            self.stats.error("{}: {}".format(self.datadir, err))
+            log.error("Save ({}) - {}", self.datadir, err)
+
+    def scan(self) -> dict:
+        """ Get the signatures of the csv files in the data directory. """
+        files = {}
+        try:
+            names = sorted(os.listdir(self.datadir))
+        except OSError as err:
+            self.stats.error("{}: {}".format(self.datadir, err))
+            log.error("Scan ({}) - {}", self.datadir, err)
+            return files
+
+        for name in names:
+            if not name.endswith(".csv"):
+                continue
+            try:
+                files[name] = _signature(os.path.join(self.datadir, name))
+            except OSError as err:
+                # Renamed or deleted since listed.
+                self.stats.error("{}: {}".format(name, err))
+                log.error("Scan ({}) - {}", name, err)
+        return files
+
+    def step(self):
+        """ Run a single scan and prepare the changed datasets. """
+        self.stats.cycles += 1
+
+        # Other processes may have added the missing rows since the last scan.
+        db.Operation.clear_misses()
+
+        current = self.scan()
+        changed = False
+
+        for csvfile, sign in current.items():
+            if csvfile not in prep.datasets:
+                if csvfile not in self.skipped:
+                    log.warn("Unknown dataset, skipped: {}", csvfile)
+                    self.skipped.add(csvfile)
+                continue
+
+            # Wait until the file is no longer being written.
+            if sign == self.done.get(csvfile) or sign != self.seen.get(csvfile):
+                continue
+
+            # Wait before retrying an unchanged file that failed.
+            failed = self.failed.get(csvfile)
+            if failed and failed[0] == sign and time.time() < failed[1]:
+                continue
+
+            t1 = time.time()
+            try:
+                self.polylist, rows = prep.prepare_dataset(self.session,
+                                                           self.datadir, csvfile,
+                                                           self.polylist,
+                                                           debug = self.debug)
+            except Exception as err:
+                self.session.rollback()
+                self.failed[csvfile] = (sign, time.time() + self.retry_delay)
+                self.stats.error("{}: {}".format(csvfile, err))
+                log.error("Prepare ({}) - {}", csvfile, err)
+            else:
+                # Do not prepare the same file until it changes again.
+                self.done[csvfile] = sign
+                self.failed.pop(csvfile, None)
+                self.stats.files += 1
+                self.stats.rows += rows
+                self.stats.last_error = None
+                changed = True
+                log.done("Prepared {} rows from {}", rows, csvfile)
+
+            self.stats.last_file = csvfile
+            self.stats.busy += time.time() - t1
+
+        # Nothing to save until a new polymer is found.
+        if changed and not self.polylist.df.empty:
+            prep.save_new_polymers_list(self.polylist.df, self.polyfile)
+
+        self.seen = current
+        self._save(changed)
+
+
+def run(args):
+    watcher = Watcher(args.session, args.datadir, debug=args.debug)
+
+    # Stop gracefully when running as a service.
+    stop = []
+    signal.signal(signal.SIGTERM, lambda *_: stop.append(True))
+
+    try:
+        prep.save_new_properties(args.datadir)
+    except OSError as err:
+        log.error("Save ({}) - {}", args.datadir, err)
+
+    log.note("Watching {} every {} s.", args.datadir, args.interval)
+
+    try:
+        while not stop:
+            watcher.step()
+            time.sleep(args.interval)
+
+    except KeyboardInterrupt:
+        pass
+
+    watcher._save(False)
+    log.note("Stopped watching: {}", watcher.stats.serialize())